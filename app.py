@@ -3,6 +3,7 @@ from flask import Flask, render_template, request, redirect, flash, session, url
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from models import db, User, ParkingLot, ParkingSpot, Reservation
+import capacity
 import sqlite3
 
 app = Flask(__name__)
@@ -11,11 +12,11 @@ app.secret_key = 'your-secret-key'
 # ✅ Use absolute path to point to the correct database location
 basedir = os.path.abspath(os.path.dirname(__file__))
 db_path = os.path.join(basedir, 'instance', 'parking.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', f"sqlite:///{db_path}")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Print path to confirm it's correct
-print("[DEBUG] Using database at:", db_path)
+print("[DEBUG] Using database at:", app.config['SQLALCHEMY_DATABASE_URI'])
 
 db.init_app(app)
 
@@ -34,6 +35,36 @@ def initialize_admin():
     else:
         print("ℹ️ Admin already exists")
 
+# Add columns introduced after the first release to an existing database
+def upgrade_schema():
+    inspector = db.inspect(db.engine)
+    lot_columns = {c['name'] for c in inspector.get_columns('parking_lot')}
+    spot_columns = {c['name'] for c in inspector.get_columns('parking_spot')}
+    reservation_columns = {c['name'] for c in inspector.get_columns('reservation')}
+    with db.engine.begin() as conn:
+        if 'is_active' not in lot_columns:
+            conn.exec_driver_sql("ALTER TABLE parking_lot ADD COLUMN is_active BOOLEAN NOT NULL DEFAULT 1")
+        if 'spot_number' not in spot_columns:
+            conn.exec_driver_sql("ALTER TABLE parking_spot ADD COLUMN spot_number INTEGER")
+        if 'spot_number' not in reservation_columns:
+            conn.exec_driver_sql("ALTER TABLE reservation ADD COLUMN spot_number INTEGER")
+    for index in ParkingSpot.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    if 'spot_number' not in spot_columns:
+        # Number existing spots 1..n per lot and fix capacities that drifted
+        capacity.number_new_spots()
+        capacity.sync_capacity()
+        db.session.commit()
+    if 'spot_number' not in reservation_columns:
+        # Freeze the current spot number onto existing reservations
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "UPDATE reservation SET spot_number = "
+                "(SELECT spot_number FROM parking_spot WHERE parking_spot.id = reservation.spot_id)"
+            )
+    if 'spot_number' not in spot_columns or 'spot_number' not in reservation_columns:
+        print("✅ Database schema upgraded")
+
 
 #  Home Page
 # Log out the current user and clear the session
@@ -161,14 +192,14 @@ def admin_dashboard():
     search = request.args.get('search', '').strip()
     user_search = request.args.get('user_search', '').strip()
     if search:
-        parking_lots = ParkingLot.query.filter(
+        parking_lots = ParkingLot.query.filter_by(is_active=True).filter(
             (ParkingLot.lot_name.ilike(f'%{search}%')) |
             (ParkingLot.address.ilike(f'%{search}%')) |
             (ParkingLot.pincode.ilike(f'%{search}%')) |
             (ParkingLot.city.ilike(f'%{search}%'))
         ).all()
     else:
-        parking_lots = ParkingLot.query.all()
+        parking_lots = ParkingLot.query.filter_by(is_active=True).all()
     if user_search:
         users = User.query.filter(User.username.ilike(f'%{user_search}%')).all()
     else:
@@ -199,16 +230,19 @@ def create_lot():
         address = request.form['address']
         city = request.form['city']
         pincode = request.form['pincode']
-        capacity = int(request.form['capacity'])
+        lot_capacity = int(request.form['capacity'])
         price = float(request.form['price'])
 
-        new_lot = ParkingLot(lot_name=lot_name, address=address, city=city, pincode=pincode, capacity=capacity, price=price)
+        if lot_capacity < 1:
+            flash('❌ Capacity must be at least 1.')
+            return redirect('/admin/create_lot')
+
+        new_lot = ParkingLot(lot_name=lot_name, address=address, city=city, pincode=pincode, capacity=lot_capacity, price=price)
         db.session.add(new_lot)
+        db.session.flush()
+        capacity.add_spots(new_lot.id, lot_capacity)
+        capacity.sync_capacity(new_lot.id)
         db.session.commit()
-        for i in range(capacity):
-            new_spot = ParkingSpot(lot_id=new_lot.id, status="available")
-            db.session.add(new_spot)
-            db.session.commit()
         flash('✅ Parking lot created.')
         return redirect('/admin/dashboard')
 
@@ -221,7 +255,7 @@ def edit_lot(lot_id):
         flash("Unauthorized access.")
         return redirect("/login")
 
-    lot = ParkingLot.query.get_or_404(lot_id)
+    lot = ParkingLot.query.filter_by(id=lot_id, is_active=True).first_or_404()
 
     if request.method == 'POST':
         lot.lot_name = request.form['lot_name']
@@ -229,26 +263,20 @@ def edit_lot(lot_id):
         lot.city = request.form['city']
         lot.pincode = request.form['pincode']
         new_capacity = int(request.form['capacity'])
-        old_capacity = lot.capacity
-        lot.capacity = new_capacity
         lot.price = float(request.form['price'])
-        db.session.commit()
 
-        # Adjust ParkingSpot records if capacity changed
-        if new_capacity > old_capacity:
-            # Add new spots
-            for i in range(old_capacity, new_capacity):
-                new_spot = ParkingSpot(lot_id=lot.id, status="available")
-                db.session.add(new_spot)
-            db.session.commit()
-        elif new_capacity < old_capacity:
-            # Remove available spots (do not remove booked spots)
-            spots_to_remove = ParkingSpot.query.filter_by(lot_id=lot.id, status="available").limit(old_capacity - new_capacity).all()
-            for spot in spots_to_remove:
-                db.session.delete(spot)
-            db.session.commit()
+        if new_capacity < 1:
+            flash('❌ Capacity must be at least 1.')
+            return redirect(f'/admin/edit_lot/{lot.id}')
 
-        flash('✅ Parking lot updated.')
+        # Adjust ParkingSpot records in bulk (booked spots are never removed)
+        final_capacity = capacity.resize_lot(lot.id, new_capacity)
+        db.session.commit()
+
+        if final_capacity > new_capacity:
+            flash(f'⚠️ Parking lot updated, but capacity is {final_capacity} because some spots are booked.')
+        else:
+            flash('✅ Parking lot updated.')
         return redirect('/admin/dashboard')
 
     return render_template('edit_lot.html', lot=lot)
@@ -260,16 +288,14 @@ def delete_lot(lot_id):
         flash("Unauthorized access.")
         return redirect("/login")
 
-    lot = ParkingLot.query.get_or_404(lot_id)
-    booked_spots = ParkingSpot.query.filter_by(lot_id=lot.id, status='booked').count()  # fixed: use 'booked'
+    lot = ParkingLot.query.filter_by(id=lot_id, is_active=True).first_or_404()
 
-    if booked_spots > 0:
-        flash("❌ Cannot delete. Spots are still booked.")
-    else:
-        ParkingSpot.query.filter_by(lot_id=lot.id).delete()
-        db.session.delete(lot)
+    # Soft delete so reservation history still points at real spots
+    if capacity.delete_lot(lot.id):
         db.session.commit()
         flash("✅ Parking lot deleted.")
+    else:
+        flash("❌ Cannot delete. Spots are still booked.")
 
     return redirect('/admin/dashboard')
 
@@ -282,14 +308,14 @@ def user_dashboard():
 
     search = request.args.get('search', '').strip()
     if search:
-        lots = ParkingLot.query.filter(
+        lots = ParkingLot.query.filter_by(is_active=True).filter(
             (ParkingLot.lot_name.ilike(f'%{search}%')) |
             (ParkingLot.address.ilike(f'%{search}%')) |
             (ParkingLot.pincode.ilike(f'%{search}%')) |
             (ParkingLot.city.ilike(f'%{search}%'))
         ).all()
     else:
-        lots = ParkingLot.query.all()
+        lots = ParkingLot.query.filter_by(is_active=True).all()
 
     lot_info = []
     for lot in lots:
@@ -340,8 +366,8 @@ def view_spots(lot_id):
         flash("Unauthorized access.")
         return redirect("/login")
 
-    lot = ParkingLot.query.get_or_404(lot_id)
-    spots = ParkingSpot.query.filter_by(lot_id=lot_id).all()
+    lot = ParkingLot.query.filter_by(id=lot_id, is_active=True).first_or_404()
+    spots = ParkingSpot.query.filter(ParkingSpot.lot_id == lot_id, ParkingSpot.status != capacity.REMOVED).order_by(ParkingSpot.spot_number).all()
     return render_template("view_spots.html", lot=lot, spots=spots)
 
 #  Delete Spot (if Empty)
@@ -351,16 +377,21 @@ def delete_spot(spot_id):
         flash("Unauthorized access.")
         return redirect("/login")
 
-    spot = ParkingSpot.query.get_or_404(spot_id)
+    # Removed spots and spots in deleted lots no longer exist for the admin
+    spot = ParkingSpot.query.join(ParkingLot).filter(
+        ParkingSpot.id == spot_id,
+        ParkingSpot.status != capacity.REMOVED,
+        ParkingLot.is_active.is_(True)
+    ).first_or_404()
 
-    if spot.status == "available":  # fixed: use 'available'
-        db.session.delete(spot)
+    lot_id = spot.lot_id
+    if capacity.remove_spot(spot.id):
         db.session.commit()
         flash("✅ Spot deleted successfully.")
     else:
         flash("❌ Cannot delete booked spot.")
 
-    return redirect(f"/admin/lot/{spot.lot_id}/spots")
+    return redirect(f"/admin/lot/{lot_id}/spots")
 
 @app.route('/reserve/<int:lot_id>', methods=['POST'])
 def reserve_spot(lot_id):
@@ -368,17 +399,19 @@ def reserve_spot(lot_id):
         flash("Unauthorized access.")
         return redirect("/login")
 
-    # Get all available spots in this lot, ordered by ID
-    available_spots = ParkingSpot.query.filter_by(lot_id=lot_id, status='available').order_by(ParkingSpot.id.asc()).all()
-    if available_spots:
-        # The per-lot spot number is the index in this list + 1
-        spot = available_spots[0]
+    # Take the lowest-numbered available spot in this lot (deleted lots take no bookings)
+    spot = ParkingSpot.query.join(ParkingLot).filter(
+        ParkingSpot.lot_id == lot_id,
+        ParkingSpot.status == 'available',
+        ParkingLot.is_active.is_(True)
+    ).order_by(ParkingSpot.spot_number.asc()).first()
+    if spot:
         spot.status = "booked"
-        # Calculate spot_number for this reservation
-        spot_number = 1  # always the first available
+        spot_number = spot.spot_number
         reservation = Reservation(
             spot_id=spot.id,
-            user_id=session.get("user_id")
+            user_id=session.get("user_id"),
+            spot_number=spot_number
         )
         db.session.add(reservation)
         db.session.commit()
@@ -397,7 +430,10 @@ def release_spot(reservation_id):
     reservation = Reservation.query.get(reservation_id)
     if reservation and reservation.user_id == session.get("user_id"):
         spot = ParkingSpot.query.get(reservation.spot_id)
-        if spot:
+        # Only an active booking can be released; removed spots stay removed
+        if reservation.leaving_timestamp is not None:
+            flash("❌ Reservation already released.")
+        elif spot and spot.status == "booked":
             spot.status = "available"
             # Calculate total time and save leaving_timestamp
             from datetime import datetime
@@ -423,9 +459,9 @@ def reserve(lot_id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    lot = ParkingLot.query.get_or_404(lot_id)
+    lot = ParkingLot.query.filter_by(id=lot_id, is_active=True).first_or_404()
     empty_spots = ParkingSpot.query.filter_by(lot_id=lot.id, status='available').count()
-    spots = ParkingSpot.query.filter_by(lot_id=lot.id).all()
+    spots = ParkingSpot.query.filter(ParkingSpot.lot_id == lot.id, ParkingSpot.status != capacity.REMOVED).order_by(ParkingSpot.spot_number).all()
 
     return render_template('reserve.html', lot=lot, empty_spots=empty_spots, spots=spots)
 
@@ -463,7 +499,7 @@ def reserve(lot_id):
 @app.route('/admin_charts')
 def admin_charts():
     # Prepare summary data for charts
-    parking_lots = ParkingLot.query.all()
+    parking_lots = ParkingLot.query.filter_by(is_active=True).all()
     users = User.query.all()
     reservations = Reservation.query.all()
     from collections import defaultdict
@@ -615,5 +651,6 @@ def user_charts():
 if __name__ == '__main__':
     with app.app_context():
         db.create_all()
+        upgrade_schema()
         initialize_admin()
     app.run(debug=True)
\ No newline at end of file
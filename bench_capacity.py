@@ -0,0 +1,91 @@
+# Benchmark: resizing a 100k-spot lot with the set-based capacity API
+# versus the old row-by-row approach (ORM objects added/deleted one at a time).
+#
+# Runs against a throwaway SQLite database, never instance/parking.db.
+#   python bench_capacity.py [spots]
+
+import os
+import sys
+import tempfile
+import time
+
+from flask import Flask
+
+from models import db, ParkingLot, ParkingSpot, Reservation, User
+import capacity
+
+
+def make_app(db_file):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_file}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def timed(label, fn):
+    start = time.perf_counter()
+    fn()
+    db.session.commit()
+    print(f"{label:<50} {time.perf_counter() - start:8.3f}s")
+
+
+def new_lot(name):
+    lot = ParkingLot(lot_name=name, capacity=0, price=10.0)
+    db.session.add(lot)
+    db.session.commit()
+    return lot.id
+
+
+# The pre-existing edit_lot loops, kept here only as the baseline
+def row_by_row_grow(lot_id, count):
+    for i in range(count):
+        db.session.add(ParkingSpot(lot_id=lot_id, status="available"))
+
+
+def row_by_row_shrink(lot_id, count):
+    for spot in ParkingSpot.query.filter_by(lot_id=lot_id, status="available").limit(count).all():
+        db.session.delete(spot)
+
+
+def main():
+    spots = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    half = spots // 2
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            print(f"Resizing a {spots}-spot lot\n")
+
+            lot_id = new_lot('Row by row')
+            timed(f"row-by-row grow 0 -> {spots}", lambda: row_by_row_grow(lot_id, spots))
+            timed(f"row-by-row shrink {spots} -> {half}", lambda: row_by_row_shrink(lot_id, half))
+
+            lot_id = new_lot('Set based')
+            timed(f"resize_lot grow 0 -> {spots}", lambda: capacity.resize_lot(lot_id, spots))
+            timed(f"resize_lot shrink {spots} -> {half}", lambda: capacity.resize_lot(lot_id, half))
+            timed(f"resize_lot grow {half} -> {spots}", lambda: capacity.resize_lot(lot_id, spots))
+
+            # A booked spot near the top keeps its number, so the shrink leaves a gap
+            user = User(username='bench', password='x')
+            db.session.add(user)
+            db.session.flush()
+            spot = ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=spots - 1, status='available').one()
+            spot.status = 'booked'
+            db.session.add(Reservation(spot_id=spot.id, user_id=user.id, spot_number=spot.spot_number))
+            db.session.commit()
+            timed(f"resize_lot shrink {spots} -> {half} (booked spot)", lambda: capacity.resize_lot(lot_id, half))
+            timed("delete_lot (blocked by booking)", lambda: capacity.delete_lot(lot_id))
+            spot = db.session.get(ParkingSpot, spot.id)
+            spot.status = 'available'
+            db.session.commit()
+            timed("delete_lot", lambda: capacity.delete_lot(lot_id))
+
+            lot = db.session.get(ParkingLot, lot_id)
+            live = ParkingSpot.query.filter(ParkingSpot.lot_id == lot_id, ParkingSpot.status != capacity.REMOVED).count()
+            orphans = Reservation.query.filter(~Reservation.spot_id.in_(db.session.query(ParkingSpot.id))).count()
+            print(f"\ncapacity={lot.capacity} live spots={live} orphaned reservations={orphans}")
+
+
+if __name__ == '__main__':
+    main()
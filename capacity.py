@@ -0,0 +1,230 @@
+from sqlalchemy import func, insert, literal, select, update, exists
+from sqlalchemy.orm import aliased
+
+from models import db, ParkingLot, ParkingSpot
+
+# Set-based capacity management for parking lots.
+#
+# Every operation here runs as a handful of single SQL statements instead of
+# loading ParkingSpot rows one by one. Spots are never hard-deleted: removed
+# spots keep their row and last spot_number (status 'removed') so
+# Reservation.spot and res.spot.lot keep working for history. A booked spot's
+# number never changes, so shrinking can leave gaps that add_spots fills first.
+# None of these functions commit; the caller commits once, so a whole resize
+# happens in one transaction.
+
+REMOVED = 'removed'
+_NO_SYNC = {"synchronize_session": False}
+
+
+def _live_spots(lot_id=None):
+    # WHERE clause for spots that still exist (available or booked)
+    clause = ParkingSpot.status != REMOVED
+    if lot_id is not None:
+        clause = clause & (ParkingSpot.lot_id == lot_id)
+    return clause
+
+
+def _execute(stmt):
+    result = db.session.execute(stmt, execution_options=_NO_SYNC)
+    # Bulk statements bypass the identity map, so drop any stale loaded state
+    db.session.expire_all()
+    return result
+
+
+def _number_sequence(upto):
+    # Recursive CTE yielding n = 1 .. upto
+    seq = select(literal(1).label('n')).cte('seq', recursive=True)
+    return seq.union_all(select(seq.c.n + 1).where(seq.c.n < upto))
+
+
+def _live_numbers(lot_id, status=None):
+    clause = _live_spots(lot_id) & ParkingSpot.spot_number.is_not(None)
+    if status is not None:
+        clause = clause & (ParkingSpot.status == status)
+    return select(ParkingSpot.spot_number).where(clause)
+
+
+def add_spots(lot_id, count):
+    """Add `count` available spots to a lot with one INSERT ... SELECT.
+
+    New spots take the lowest free numbers first (gaps left by removed
+    spots), then continue after the highest number in use.
+    """
+    if count <= 0:
+        return 0
+    last_number = db.session.execute(
+        select(func.coalesce(func.max(ParkingSpot.spot_number), 0)).where(_live_spots(lot_id))
+    ).scalar()
+
+    seq = _number_sequence(last_number + count)
+    free = (
+        select(seq.c.n)
+        .where(seq.c.n.not_in(_live_numbers(lot_id)))
+        .order_by(seq.c.n)
+        .limit(count)
+        .subquery()
+    )
+    stmt = insert(ParkingSpot.__table__).from_select(
+        ['lot_id', 'status', 'spot_number'],
+        select(literal(lot_id), literal('available'), free.c.n),
+    )
+    _execute(stmt)
+    return count
+
+
+def remove_spots(lot_id, count):
+    """Soft-delete up to `count` available spots, highest spot numbers first.
+
+    Booked spots are never removed, so fewer than `count` spots may go.
+    Returns the number of spots actually removed.
+    """
+    if count <= 0:
+        return 0
+    victims = (
+        select(ParkingSpot.id)
+        .where(ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'available')
+        .order_by(ParkingSpot.spot_number.desc())
+        .limit(count)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(ParkingSpot)
+        .where(ParkingSpot.id.in_(victims))
+        .values(status=REMOVED, booked_by=None)
+    )
+    return _execute(stmt).rowcount
+
+
+def compact_lot(lot_id):
+    """Renumber available spots (keeping their order) to close gaps.
+
+    Booked spots keep their numbers; available spots move into the lowest
+    numbers the booked spots leave free. Skipped when the lot is gap-free.
+    """
+    highest, live = db.session.execute(
+        select(func.max(ParkingSpot.spot_number), func.count()).where(_live_spots(lot_id))
+    ).one()
+    if highest == live:
+        return
+
+    # Pair the k-th available spot with the k-th number not held by a booked spot
+    seq = _number_sequence(live)
+    free = (
+        select(seq.c.n, func.row_number().over(order_by=seq.c.n).label('k'))
+        .where(seq.c.n.not_in(_live_numbers(lot_id, status='booked')))
+        .subquery()
+    )
+    ranked = (
+        select(
+            ParkingSpot.id.label('id'),
+            func.row_number().over(order_by=(ParkingSpot.spot_number, ParkingSpot.id)).label('k'),
+        )
+        .where(ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'available')
+        .subquery()
+    )
+    target = (
+        select(ranked.c.id, free.c.n)
+        .join(free, ranked.c.k == free.c.k)
+        .subquery()
+    )
+    stmt = (
+        update(ParkingSpot)
+        .where(ParkingSpot.id == target.c.id)
+        .where(ParkingSpot.spot_number.is_distinct_from(target.c.n))
+        .values(spot_number=target.c.n)
+    )
+    _execute(stmt)
+
+
+def number_new_spots():
+    """Give every live spot without a spot_number the next numbers in its lot.
+
+    Used when upgrading databases created before spot numbers existed.
+    """
+    numbered = aliased(ParkingSpot)
+    highest = (
+        select(func.coalesce(func.max(numbered.spot_number), 0))
+        .where(numbered.lot_id == ParkingSpot.lot_id, numbered.status != REMOVED)
+        .scalar_subquery()
+    )
+    ranked = (
+        select(
+            ParkingSpot.id.label('id'),
+            (highest + func.row_number().over(
+                partition_by=ParkingSpot.lot_id,
+                order_by=ParkingSpot.id,
+            )).label('n'),
+        )
+        .where(_live_spots(), ParkingSpot.spot_number.is_(None))
+        .subquery()
+    )
+    stmt = (
+        update(ParkingSpot)
+        .where(ParkingSpot.id == ranked.c.id)
+        .values(spot_number=ranked.c.n)
+    )
+    _execute(stmt)
+
+
+def sync_capacity(lot_id=None):
+    """Set capacity to the real number of live spots (all lots if no lot_id)."""
+    live_count = (
+        select(func.count(ParkingSpot.id))
+        .where(ParkingSpot.lot_id == ParkingLot.id, ParkingSpot.status != REMOVED)
+        .scalar_subquery()
+    )
+    stmt = update(ParkingLot).values(capacity=live_count)
+    if lot_id is not None:
+        stmt = stmt.where(ParkingLot.id == lot_id)
+    _execute(stmt)
+
+
+def resize_lot(lot_id, new_capacity):
+    """Grow or shrink a lot to `new_capacity` spots and return the resulting capacity.
+
+    Shrinking only removes available spots, so the result can stay above
+    `new_capacity` while spots are booked. Booked spots keep their numbers.
+    """
+    current = db.session.execute(
+        select(func.count(ParkingSpot.id)).where(_live_spots(lot_id))
+    ).scalar()
+    if new_capacity > current:
+        add_spots(lot_id, new_capacity - current)
+    elif new_capacity < current:
+        remove_spots(lot_id, current - new_capacity)
+    sync_capacity(lot_id)
+    return db.session.get(ParkingLot, lot_id).capacity
+
+
+def remove_spot(spot_id):
+    """Soft-delete a single spot if it is available. Returns True on success."""
+    stmt = (
+        update(ParkingSpot)
+        .where(ParkingSpot.id == spot_id, ParkingSpot.status == 'available')
+        .values(status=REMOVED, booked_by=None)
+    )
+    if _execute(stmt).rowcount == 0:
+        return False
+    lot_id = db.session.execute(select(ParkingSpot.lot_id).where(ParkingSpot.id == spot_id)).scalar()
+    sync_capacity(lot_id)
+    return True
+
+
+def delete_lot(lot_id):
+    """Soft-delete a lot and all its spots unless any spot is booked.
+
+    Returns False (and changes nothing) when the lot still has booked spots.
+    """
+    has_booked = db.session.execute(
+        select(exists().where(ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'booked'))
+    ).scalar()
+    if has_booked:
+        return False
+    _execute(
+        update(ParkingSpot)
+        .where(_live_spots(lot_id))
+        .values(status=REMOVED, booked_by=None)
+    )
+    _execute(update(ParkingLot).where(ParkingLot.id == lot_id).values(is_active=False, capacity=0))
+    return True
@@ -18,19 +18,24 @@ class ParkingLot(db.Model):
     pincode = db.Column(db.String(20), nullable=True)
     capacity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False, default=0.0)
+    is_active = db.Column(db.Boolean, nullable=False, default=True, server_default='1')  # False once the lot is deleted
     spots = db.relationship('ParkingSpot', backref='lot', lazy=True)
 
 class ParkingSpot(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.id'), nullable=False)
-    status = db.Column(db.String(20), default='available')
+    status = db.Column(db.String(20), default='available')  # 'available', 'booked' or 'removed' (soft-deleted)
+    spot_number = db.Column(db.Integer, nullable=True)  # 1..capacity within the lot (last number kept once removed)
     booked_by = db.Column(db.String(80), nullable=True)
     reservations = db.relationship('Reservation', backref='spot', lazy=True)  # Changed backref to 'spot'
 
+    __table_args__ = (db.Index('ix_parking_spot_lot_status_number', 'lot_id', 'status', 'spot_number'),)
+
 class Reservation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     spot_id = db.Column(db.Integer, db.ForeignKey('parking_spot.id'), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    spot_number = db.Column(db.Integer, nullable=True)  # spot number at booking time, unaffected by renumbering
     parking_timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     leaving_timestamp = db.Column(db.DateTime, nullable=True)
     total_cost = db.Column(db.Float, nullable=True)
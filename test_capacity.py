@@ -0,0 +1,213 @@
+import os
+
+# Run against a throwaway in-memory database, never instance/parking.db
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+import pytest
+
+import app as parking_app
+from models import db, ParkingLot, ParkingSpot, Reservation, User
+import capacity
+
+
+@pytest.fixture
+def app():
+    flask_app = parking_app.app
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+def make_lot(spots):
+    lot = ParkingLot(lot_name='Test', capacity=0, price=10.0)
+    db.session.add(lot)
+    db.session.flush()
+    capacity.resize_lot(lot.id, spots)
+    db.session.commit()
+    return lot.id
+
+
+def make_user(username='driver'):
+    user = User(username=username, password='x')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def live_numbers(lot_id):
+    return [s.spot_number for s in ParkingSpot.query.filter(
+        ParkingSpot.lot_id == lot_id, ParkingSpot.status != capacity.REMOVED
+    ).order_by(ParkingSpot.spot_number)]
+
+
+def book(lot_id, spot_number, user_id):
+    spot = ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=spot_number, status='available').one()
+    spot.status = 'booked'
+    db.session.add(Reservation(spot_id=spot.id, user_id=user_id, spot_number=spot_number))
+    db.session.commit()
+    return spot.id
+
+
+def assert_active_numbers_stable(lot_id):
+    active = Reservation.query.join(ParkingSpot).filter(
+        ParkingSpot.lot_id == lot_id, Reservation.leaving_timestamp.is_(None)
+    ).all()
+    for res in active:
+        assert res.spot_number == res.spot.spot_number
+    numbers = [res.spot_number for res in active]
+    assert len(numbers) == len(set(numbers))
+
+
+def login(client, user_id):
+    with client.session_transaction() as sess:
+        sess['role'] = 'user'
+        sess['user_id'] = user_id
+
+
+def test_grow(app):
+    lot_id = make_lot(5)
+    assert capacity.resize_lot(lot_id, 8) == 8
+    db.session.commit()
+    assert live_numbers(lot_id) == list(range(1, 9))
+
+
+def test_shrink_keeps_booked_spots(app):
+    lot_id = make_lot(5)
+    spot_id = book(lot_id, 5, make_user())
+
+    assert capacity.resize_lot(lot_id, 2) == 2
+    db.session.commit()
+    assert db.session.get(ParkingSpot, spot_id).status == 'booked'
+    # The booked spot keeps its number; the gap below it is left open
+    assert live_numbers(lot_id) == [1, 5]
+    assert_active_numbers_stable(lot_id)
+
+    assert capacity.resize_lot(lot_id, 4) == 4
+    db.session.commit()
+    assert live_numbers(lot_id) == [1, 2, 3, 5]
+    assert_active_numbers_stable(lot_id)
+
+    # Only the booked spot is left, so capacity stays above the target
+    assert capacity.resize_lot(lot_id, 0) == 1
+    db.session.commit()
+    assert db.session.get(ParkingLot, lot_id).capacity == 1
+    assert db.session.get(ParkingSpot, spot_id).status == 'booked'
+    assert live_numbers(lot_id) == [5]
+    assert_active_numbers_stable(lot_id)
+
+
+def test_edit_lot_rejects_capacity_below_one(app):
+    lot_id = make_lot(3)
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['role'] = 'admin'
+
+    form = dict(lot_name='Test', address='', city='', pincode='', capacity='-3', price='10')
+    client.post(f'/admin/edit_lot/{lot_id}', data=form)
+    db.session.expire_all()
+    assert db.session.get(ParkingLot, lot_id).capacity == 3
+    assert live_numbers(lot_id) == [1, 2, 3]
+
+
+def test_shrink_grow_reserve_never_reuses_booked_number(app):
+    lot_id = make_lot(5)
+    first, second = make_user('first'), make_user('second')
+    client = app.test_client()
+
+    # First driver ends up holding spot 5 only
+    login(client, first)
+    for _ in range(5):
+        client.post(f'/reserve/{lot_id}')
+    for res in Reservation.query.filter(Reservation.spot_number < 5).all():
+        client.post(f'/release/{res.id}')
+    assert_active_numbers_stable(lot_id)
+
+    assert capacity.resize_lot(lot_id, 2) == 2
+    db.session.commit()
+    assert capacity.resize_lot(lot_id, 5) == 5
+    db.session.commit()
+    assert live_numbers(lot_id) == [1, 2, 3, 4, 5]
+
+    login(client, second)
+    for _ in range(5):
+        client.post(f'/reserve/{lot_id}')
+    db.session.expire_all()
+    assert Reservation.query.filter_by(user_id=second).count() == 4
+    assert_active_numbers_stable(lot_id)
+
+
+def test_remove_spot_then_compact(app):
+    lot_id = make_lot(5)
+    spot = ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=2).one()
+
+    assert capacity.remove_spot(spot.id)
+    db.session.commit()
+    assert live_numbers(lot_id) == [1, 3, 4, 5]
+    assert db.session.get(ParkingLot, lot_id).capacity == 4
+
+    # Compaction moves available spots only; booked spot 5 keeps its number
+    book(lot_id, 5, make_user())
+    capacity.compact_lot(lot_id)
+    db.session.commit()
+    assert live_numbers(lot_id) == [1, 2, 3, 5]
+    assert_active_numbers_stable(lot_id)
+    assert capacity.resize_lot(lot_id, 5) == 5
+    db.session.commit()
+    assert live_numbers(lot_id) == [1, 2, 3, 4, 5]
+
+    # The removed row keeps its last number for history
+    removed = db.session.get(ParkingSpot, spot.id)
+    assert removed.status == capacity.REMOVED
+    assert removed.spot_number == 2
+    assert not capacity.remove_spot(spot.id)
+
+
+def test_delete_lot_blocked_then_allowed(app):
+    lot_id = make_lot(3)
+    spot_id = book(lot_id, 1, make_user())
+
+    assert not capacity.delete_lot(lot_id)
+    assert db.session.get(ParkingLot, lot_id).is_active
+
+    db.session.get(ParkingSpot, spot_id).status = 'available'
+    db.session.commit()
+    assert capacity.delete_lot(lot_id)
+    db.session.commit()
+    lot = db.session.get(ParkingLot, lot_id)
+    assert not lot.is_active
+    assert lot.capacity == 0
+    assert live_numbers(lot_id) == []
+    assert Reservation.query.one().spot.lot.id == lot_id
+
+
+def test_stale_release_does_not_revive_removed_spot(app):
+    lot_id = make_lot(3)
+    user_id = make_user()
+    client = app.test_client()
+    login(client, user_id)
+
+    client.post(f'/reserve/{lot_id}')
+    reservation = Reservation.query.one()
+    assert reservation.spot_number == 1
+    client.post(f'/release/{reservation.id}')
+    released = db.session.get(Reservation, reservation.id)
+    leaving, cost = released.leaving_timestamp, released.total_cost
+    assert leaving is not None
+
+    assert capacity.delete_lot(lot_id)
+    db.session.commit()
+
+    client.post(f'/release/{reservation.id}')
+    db.session.expire_all()
+    spot = db.session.get(ParkingSpot, reservation.spot_id)
+    assert spot.status == capacity.REMOVED
+    assert spot.spot_number == 1
+    released = db.session.get(Reservation, reservation.id)
+    assert (released.leaving_timestamp, released.total_cost) == (leaving, cost)
+
+    client.post(f'/reserve/{lot_id}')
+    assert Reservation.query.count() == 1
+    assert db.session.get(ParkingLot, lot_id).capacity == 0